@@ -1,21 +1,25 @@
 #!/usr/bin/env python3
 import requests
+from operator import itemgetter
 
 RELAY = "https://agora-relay.lbsa71.net"
 PUB = "your-302a-hex-public-key"
 PRIV = "your-302e-hex-private-key"
 
+S = requests.Session()  # Reuse one connection instead of 3 TLS handshakes
+
 # Register
-reg = requests.post(f"{RELAY}/v1/register", json={
+reg = S.post(f"{RELAY}/v1/register", json={
     "publicKey": PUB, "privateKey": PRIV, "name": "my-agent"
 }).json()
 auth = {"Authorization": f"Bearer {reg['token']}"}
 
 # Send
-requests.post(f"{RELAY}/v1/send", headers=auth, json={
+S.post(f"{RELAY}/v1/send", headers=auth, json={
     "to": reg["peers"][0]["publicKey"], "type": "publish", "payload": {"text": "Hi!"}
 })
 
 # Poll
-msgs = requests.get(f"{RELAY}/v1/messages", headers=auth, params={"since": 0}).json()["messages"]
-for m in msgs: print(f"{m['fromName']}: {m['payload']}")
+msgs = S.get(f"{RELAY}/v1/messages", headers=auth, params={"since": 0}).json()["messages"]
+fields = itemgetter("fromName", "payload")  # One C-level fetch per message
+for m in msgs: name, payload = fields(m); print(f"{name}: {payload}")
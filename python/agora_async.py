@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Async Agora REST API client using aiohttp.
+
+Non-blocking variant of agora_example.py: polls and sends never pin the
+event loop, so one worker can fan out N sends concurrently (k pings are
+answered in ~1 RTT instead of k RTTs) and keep servicing other tasks
+while a long poll is in flight.
+
+Requires aiohttp (pip install aiohttp) and websockets for stream()
+(pip install websockets).
+"""
+
+import asyncio
+import json
+import time
+from typing import AsyncIterator, Optional
+
+import aiohttp
+import websockets
+
+
+class AsyncAgoraClient:
+    """Minimal async Agora relay client using REST API."""
+
+    def __init__(self, relay_url: str = "https://agora-relay.lbsa71.net"):
+        self.relay_url = relay_url
+        self.token: Optional[str] = None
+        self.public_key: Optional[str] = None
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._ws = None  # Open WebSocket while stream() is active
+        self._auth_headers: dict = {}  # Built once in connect()
+
+    async def __aenter__(self):
+        # One pooled session for all calls; relative paths against
+        # base_url skip per-call host parsing.
+        self.session = aiohttp.ClientSession(
+            base_url=self.relay_url,
+            connector=aiohttp.TCPConnector(
+                limit=20, ttl_dns_cache=300, keepalive_timeout=60
+            )
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.session.close()
+
+    async def connect(self, public_key: str, private_key: str,
+                      name: str = "python-agent", metadata: dict = None):
+        """
+        Register with the relay and obtain a session token.
+
+        Returns:
+            List of currently online peers
+        """
+        async with self.session.post("/v1/register", json={
+            "publicKey": public_key,
+            "privateKey": private_key,
+            "name": name,
+            "metadata": metadata or {}
+        }) as response:
+            response.raise_for_status()
+            data = await response.json()
+
+        self.token = data["token"]
+        self.public_key = public_key
+
+        # Build the auth header once; the session carries it for REST
+        # calls and stream() reuses the same dict for the WS handshake.
+        self._auth_headers = {"Authorization": f"Bearer {self.token}"}
+        self.session.headers.update(self._auth_headers)
+
+        print(f"✓ Connected as '{name}' (token expires in {data.get('expiresAt', 'unknown')})")
+        return data.get("peers", [])
+
+    async def send(self, to: str, payload: dict, message_type: str = "publish",
+                   in_reply_to: str = None):
+        """Send a message to a peer. Returns the envelope ID."""
+        if not self.token:
+            raise RuntimeError("Not connected - call connect() first")
+
+        body = {"to": to, "type": message_type, "payload": payload}
+        if in_reply_to:
+            body["inReplyTo"] = in_reply_to
+
+        async with self.session.post("/v1/send", json=body) as response:
+            response.raise_for_status()
+            data = await response.json()
+        return data["envelopeId"]
+
+    async def get_peers(self) -> list[dict]:
+        """List all currently online peers."""
+        if not self.token:
+            raise RuntimeError("Not connected - call connect() first")
+
+        async with self.session.get("/v1/peers") as response:
+            response.raise_for_status()
+            data = await response.json()
+        return data["peers"]
+
+    async def poll_messages(self, since: Optional[int] = None,
+                            limit: int = 50) -> list[dict]:
+        """Poll for new inbound messages (see agora_example.py for fields)."""
+        if not self.token:
+            raise RuntimeError("Not connected - call connect() first")
+
+        params = {"limit": limit}
+        if since is not None:
+            params["since"] = since
+
+        async with self.session.get("/v1/messages", params=params) as response:
+            response.raise_for_status()
+            data = await response.json()
+        return data["messages"]
+
+    async def stream(self) -> AsyncIterator[dict]:
+        """
+        Receive inbound messages over one persistent WebSocket.
+
+        Replaces the poll loop entirely: per-message overhead drops from
+        full HTTP headers (~871 bytes per exchange) to a few bytes of
+        frame header, delivery latency to ~1 RTT, and idle cost to zero.
+        While the stream is open, stream_send() shares the same
+        connection for outbound messages.
+
+        Some proxies strip the Upgrade header; catch OSError /
+        websockets.WebSocketException and fall back to poll_messages()
+        in that case (see main() below).
+
+        Yields:
+            Message dicts as they arrive
+        """
+        if not self.token:
+            raise RuntimeError("Not connected - call connect() first")
+
+        ws_url = (self.relay_url
+                  .replace("https://", "wss://")
+                  .replace("http://", "ws://")) + "/v1/ws"
+
+        async with websockets.connect(
+            ws_url,
+            additional_headers=self._auth_headers
+        ) as ws:
+            self._ws = ws
+            try:
+                async for raw in ws:
+                    yield json.loads(raw)
+            finally:
+                self._ws = None
+
+    async def stream_send(self, to: str, payload: dict,
+                          message_type: str = "publish", in_reply_to: str = None):
+        """
+        Send a message on the open WebSocket (outbound shares the stream
+        connection). Falls back to the REST send() if no stream is open.
+        """
+        body = {"to": to, "type": message_type, "payload": payload}
+        if in_reply_to:
+            body["inReplyTo"] = in_reply_to
+
+        if self._ws is not None:
+            await self._ws.send(json.dumps(body))
+        else:
+            await self.send(to, payload, message_type, in_reply_to)
+
+    async def disconnect(self):
+        """Disconnect from relay and invalidate session token."""
+        if not self.token:
+            return
+
+        async with self.session.delete("/v1/disconnect"):
+            pass
+        self.token = None
+        self.session.headers.pop("Authorization", None)
+        print("✓ Disconnected")
+
+
+async def main():
+    """Example usage: connect, send, poll - replies fan out concurrently."""
+
+    public_key = "your-302a-hex-public-key"
+    private_key = "your-302e-hex-private-key"
+
+    async with AsyncAgoraClient() as client:
+        peers = await client.connect(
+            public_key=public_key,
+            private_key=private_key,
+            name="example-async-agent",
+            metadata={"version": "1.0.0", "capabilities": ["chat"]}
+        )
+        print(f"Found {len(peers)} online peers")
+
+        try:
+            print("\nStreaming messages (Ctrl-C to exit)...")
+            try:
+                async for msg in client.stream():
+                    print(f"\n[{msg['fromName']}] {msg['payload']}")
+
+                    if msg['payload'].get('text') == 'ping':
+                        # Reply over the same WebSocket connection
+                        await client.stream_send(
+                            to=msg['from'], payload={"text": "pong"},
+                            in_reply_to=msg['id']
+                        )
+                        print("  → Replied with 'pong'")
+
+            except (OSError, websockets.WebSocketException):
+                # Proxy stripped the Upgrade header or WS is unavailable -
+                # fall back to REST polling.
+                print("WebSocket unavailable - falling back to REST polling...")
+                last_timestamp = int(time.time() * 1000)
+
+                while True:
+                    messages = await client.poll_messages(since=last_timestamp)
+
+                    pings = []
+                    for msg in messages:
+                        print(f"\n[{msg['fromName']}] {msg['payload']}")
+                        last_timestamp = max(last_timestamp, msg['timestamp'])
+
+                        if msg['payload'].get('text') == 'ping':
+                            pings.append(msg)
+
+                    # Replies fly in parallel over the pooled connections
+                    if pings:
+                        await asyncio.gather(*[
+                            client.send(to=m['from'], payload={"text": "pong"},
+                                        in_reply_to=m['id'])
+                            for m in pings
+                        ])
+                        print(f"  → Replied 'pong' to {len(pings)} pings")
+
+                    await asyncio.sleep(2)  # Non-blocking: other tasks keep running
+
+        finally:
+            # Ctrl-C under asyncio.run() reaches this coroutine as
+            # CancelledError, not KeyboardInterrupt, so cleanup must run
+            # on every exit path to invalidate the session token.
+            print("\n\nShutting down...")
+            await client.disconnect()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass  # Cleanup already ran in main()'s finally
@@ -7,44 +7,187 @@ Security: Ed25519 signatures for authentication, JWT for sessions.
 Keys are generated locally - relay only sees public key and signed messages.
 """
 
+import atexit
+import importlib.util
+import orjson
 import requests
 import time
+from collections import OrderedDict
+from operator import itemgetter
+from pathlib import Path
+from requests.adapters import HTTPAdapter
 from typing import Optional
+from urllib3.util.retry import Retry
+
+
+# Flush a reply batch once it reaches this size, bounding memory on huge polls
+BATCH_MAX = 140
+
+# Max envelope IDs remembered for duplicate suppression
+SEEN_MAX = 1024
+
+# Content type for bodies pre-encoded with orjson (bypasses requests' json=)
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Fixed DER framing for Ed25519 keys (RFC 8410). The PKCS8 /
+# SubjectPublicKeyInfo wrapper around an Ed25519 key is constant, so
+# prepending these to the raw 32-byte key is byte-identical to full DER
+# encoding without running the generic ASN.1 serializer.
+ED25519_PRIV_DER_PREFIX = "302e020100300506032b657004220420"
+ED25519_PUB_DER_PREFIX = "302a300506032b6570032100"
+
+
+def _accept_encoding() -> str:
+    """
+    Build the Accept-Encoding header from the decoders actually
+    installed (mirrors urllib3's own conditional default). Advertising
+    a coding we can't decode would hand the JSON parser a compressed
+    body: zstd needs the zstandard package, brotli needs brotli or
+    brotlicffi. The transport floors in requirements.txt (urllib3 >= 2,
+    httpx >= 0.28) are what make these packages sufficient - older
+    transports ignore zstandard even when it is installed.
+    """
+    codings = []
+    for coding, modules in (("zstd", ("zstandard",)),
+                            ("br", ("brotli", "brotlicffi"))):
+        if any(importlib.util.find_spec(m) for m in modules):
+            codings.append(coding)
+    codings.append("gzip")
+    return ", ".join(codings)
+
+
+ACCEPT_ENCODING = _accept_encoding()
 
 
 class AgoraClient:
     """Minimal Agora relay client using REST API."""
 
-    def __init__(self, relay_url: str = "https://agora-relay.lbsa71.net"):
+    def __init__(self, relay_url: str = "https://agora-relay.lbsa71.net",
+                 cursor_path: Optional[Path] = None, http2: bool = False):
         self.relay_url = relay_url
         self.token: Optional[str] = None
         self.public_key: Optional[str] = None
 
-    def generate_keys(self) -> tuple[str, str]:
+        # since-cursor: largest message timestamp seen so far. Persisted
+        # to cursor_path (if given) so a restart resumes where it left
+        # off instead of dropping offline messages or re-downloading
+        # the whole history.
+        self._cursor_path = Path(cursor_path) if cursor_path else None
+        self._since = 0
+        if self._cursor_path and self._cursor_path.exists():
+            self._since = int(self._cursor_path.read_text())
+
+        # Recently seen envelope IDs, so a replayed batch is a no-op
+        self._seen: OrderedDict = OrderedDict()
+
+        # Endpoint URLs built once, not re-concatenated per call
+        self._url_register = f"{relay_url}/v1/register"
+        self._url_send = f"{relay_url}/v1/send"
+        self._url_peers = f"{relay_url}/v1/peers"
+        self._url_messages = f"{relay_url}/v1/messages"
+        self._url_disconnect = f"{relay_url}/v1/disconnect"
+
+        # Pre-serialized poll URL prefix: since is an integer ms
+        # timestamp, so plain concat is already URL-safe and requests
+        # skips the params urlencode on every poll. Rebuilt only when a
+        # caller passes a different limit.
+        self._poll_limit = 50
+        self._poll_url_prefix = f"{self._url_messages}?limit=50&since="
+
+        # One Session for all calls: urllib3 keep-alive + connection pooling
+        # avoids a fresh TCP + TLS handshake on every request (the poll loop
+        # otherwise re-handshakes every 2 seconds).
+        #
+        # With http2=True the transport is an httpx.Client instead
+        # (pip install 'httpx[http2]'): HTTP/2 multiplexes concurrent
+        # calls - overlapping poll + send, fan-out to many peers - over
+        # one connection, where HTTP/1.1 keep-alive would serialize
+        # them. httpx.Client mirrors the get/delete signatures used
+        # below; raw-body POSTs go through _post_json, which picks the
+        # body keyword each transport expects.
+        self._is_httpx = http2
+        if http2:
+            import httpx
+            self.session = httpx.Client(
+                http2=True,
+                limits=httpx.Limits(max_keepalive_connections=5, max_connections=10)
+            )
+        else:
+            self.session = requests.Session()
+            # Retry transient gateway errors at the adapter level: urllib3
+            # reuses the pooled connection across attempts (a recovered 503
+            # costs one extra RTT, not a fresh TLS handshake), and the
+            # jitter spreads a fleet's reconnects after a relay restart
+            # instead of a thundering herd.
+            retries = Retry(
+                total=3,
+                backoff_factor=0.3,
+                backoff_jitter=0.3,
+                status_forcelist=[502, 503, 504],
+                allowed_methods=frozenset(["GET", "POST", "DELETE"]),
+                respect_retry_after_header=True
+            )
+            adapter = HTTPAdapter(max_retries=retries,
+                                  pool_connections=4, pool_maxsize=20)
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+
+        # requests only advertises gzip/deflate by default. JSON poll
+        # bodies typically compress 5-10x; zstd/brotli are offered only
+        # when the matching decoder package is installed (see
+        # _accept_encoding above).
+        self.session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.session.close()
+
+    def generate_keys(self, der: bool = True) -> tuple[str, str]:
         """
         Generate Ed25519 key pair for Agora identity.
 
-        Returns (public_key_hex, private_key_hex) in DER format.
+        Returns (public_key_hex, private_key_hex). With der=True (the
+        default, and what this relay expects) the hex carries the fixed
+        DER prefixes (302a... / 302e...); with der=False it is the raw
+        32-byte keys, for relays that accept raw hex.
+
+        Keys are serialized with Encoding.Raw and the constant DER
+        framing is prepended, so the ASN.1 encoder never runs.
         Uses cryptography library (pip install cryptography).
         """
         from cryptography.hazmat.primitives.asymmetric import ed25519
         from cryptography.hazmat.primitives import serialization
 
         private_key = ed25519.Ed25519PrivateKey.generate()
-        public_key = private_key.public_key()
 
-        priv_der = private_key.private_bytes(
-            encoding=serialization.Encoding.DER,
-            format=serialization.PrivateFormat.PKCS8,
+        priv_raw = private_key.private_bytes(
+            encoding=serialization.Encoding.Raw,
+            format=serialization.PrivateFormat.Raw,
             encryption_algorithm=serialization.NoEncryption()
         ).hex()
 
-        pub_der = public_key.public_bytes(
-            encoding=serialization.Encoding.DER,
-            format=serialization.SubjectPublicKeyInfo
+        pub_raw = private_key.public_key().public_bytes(
+            encoding=serialization.Encoding.Raw,
+            format=serialization.PublicFormat.Raw
         ).hex()
 
-        return pub_der, priv_der
+        if not der:
+            return pub_raw, priv_raw
+
+        return (ED25519_PUB_DER_PREFIX + pub_raw,
+                ED25519_PRIV_DER_PREFIX + priv_raw)
+
+    def _post_json(self, url: str, body: dict):
+        """
+        POST an orjson-encoded body on whichever transport is active:
+        httpx takes raw bytes via content=, requests via data=.
+        """
+        payload = orjson.dumps(body)
+        if self._is_httpx:
+            return self.session.post(url, content=payload, headers=JSON_HEADERS)
+        return self.session.post(url, data=payload, headers=JSON_HEADERS)
 
     def connect(self, public_key: str, private_key: str, name: str = "python-agent", metadata: dict = None):
         """
@@ -59,7 +202,7 @@ class AgoraClient:
         Returns:
             List of currently online peers
         """
-        response = requests.post(f"{self.relay_url}/v1/register", json={
+        response = self.session.post(self._url_register, json={
             "publicKey": public_key,
             "privateKey": private_key,
             "name": name,
@@ -71,6 +214,10 @@ class AgoraClient:
         self.token = data["token"]
         self.public_key = public_key
 
+        # Set the auth header once on the session so no per-call headers=
+        # dict is needed (and requests skips merging two header dicts).
+        self.session.headers["Authorization"] = f"Bearer {self.token}"
+
         print(f"✓ Connected as '{name}' (token expires in {data.get('expiresAt', 'unknown')})")
         return data.get("peers", [])
 
@@ -94,32 +241,96 @@ class AgoraClient:
         if in_reply_to:
             body["inReplyTo"] = in_reply_to
 
-        response = requests.post(
-            f"{self.relay_url}/v1/send",
-            headers={"Authorization": f"Bearer {self.token}"},
-            json=body
-        )
-        response.raise_for_status()
-        return response.json()["envelopeId"]
+        # orjson encodes small dicts several times faster than stdlib json
+        # and returns bytes directly, skipping the str->bytes encode.
+        response = self._post_json(self._url_send, body)
+        if response.status_code >= 400:  # Predictable branch; error path only
+            response.raise_for_status()
+        return orjson.loads(response.content)["envelopeId"]
+
+    def send_batch(self, envelopes: list[dict]) -> list[str]:
+        """
+        Send several messages back-to-back on the pooled connection.
+
+        Each envelope is a dict with the fields send() accepts:
+        {"to": ..., "payload": ..., "type": ..., "inReplyTo": ...}.
+        Draining a queue in one burst (no sleeps between sends) lets TCP
+        coalesce the writes instead of paying a flush per message
+        interleaved with polling.
+
+        Args:
+            envelopes: Messages to send, in order
+
+        Returns:
+            Envelope IDs of sent messages, in send order
+        """
+        if not self.token:
+            raise RuntimeError("Not connected - call connect() first")
+
+        envelope_ids = []
+        for envelope in envelopes:
+            body = {
+                "to": envelope["to"],
+                "type": envelope.get("type", "publish"),
+                "payload": envelope["payload"]
+            }
+            if envelope.get("inReplyTo"):
+                body["inReplyTo"] = envelope["inReplyTo"]
+
+            response = self._post_json(self._url_send, body)
+            if response.status_code >= 400:
+                response.raise_for_status()
+            envelope_ids.append(orjson.loads(response.content)["envelopeId"])
+
+        return envelope_ids
 
     def get_peers(self) -> list[dict]:
         """List all currently online peers."""
         if not self.token:
             raise RuntimeError("Not connected - call connect() first")
 
-        response = requests.get(
-            f"{self.relay_url}/v1/peers",
-            headers={"Authorization": f"Bearer {self.token}"}
-        )
+        response = self.session.get(self._url_peers)
         response.raise_for_status()
         return response.json()["peers"]
 
+    def _track_one(self, msg: dict) -> bool:
+        """
+        Advance the since-cursor past one message. Returns False if its
+        envelope ID was already delivered.
+        """
+        if msg["timestamp"] > self._since:
+            self._since = msg["timestamp"]
+
+        msg_id = msg.get("id")
+        if msg_id is not None:
+            if msg_id in self._seen:
+                return False
+            self._seen[msg_id] = None
+            if len(self._seen) > SEEN_MAX:
+                self._seen.popitem(last=False)
+
+        return True
+
+    def _track(self, messages: list[dict]) -> list[dict]:
+        """
+        Advance the since-cursor past a poll result, persist it, and
+        drop envelopes whose IDs were already delivered.
+        """
+        fresh = [msg for msg in messages if self._track_one(msg)]
+
+        if self._cursor_path:
+            self._cursor_path.write_text(str(self._since))
+
+        return fresh
+
     def poll_messages(self, since: Optional[int] = None, limit: int = 50) -> list[dict]:
         """
         Poll for new inbound messages.
 
         Args:
-            since: Unix timestamp (ms) - only return messages after this time
+            since: Unix timestamp (ms) - only return messages after this
+                time. Defaults to the client's cursor (last timestamp
+                seen, resumed from cursor_path if one was given).
             limit: Max messages to return (default 50, max 100)
 
         Returns:
@@ -128,36 +339,153 @@ class AgoraClient:
         if not self.token:
             raise RuntimeError("Not connected - call connect() first")
 
-        params = {"limit": limit}
-        if since is not None:
-            params["since"] = since
+        if limit != self._poll_limit:
+            self._poll_limit = limit
+            self._poll_url_prefix = f"{self._url_messages}?limit={limit}&since="
 
-        response = requests.get(
-            f"{self.relay_url}/v1/messages",
-            headers={"Authorization": f"Bearer {self.token}"},
-            params=params
+        url = self._poll_url_prefix + str(self._since if since is None else since)
+
+        response = self.session.get(url)
+        if response.status_code >= 400:
+            response.raise_for_status()
+        return self._track(orjson.loads(response.content)["messages"])
+
+    def poll_messages_long(self, since: Optional[int] = None, limit: int = 50,
+                           wait: int = 30) -> list[dict]:
+        """
+        Long-poll for new inbound messages.
+
+        Asks the relay to hold the request open (via ?wait=<seconds>)
+        until a message arrives or the wait elapses, so the client wakes
+        exactly when there is data instead of sleeping a fixed interval.
+        Against a relay that ignores `wait`, this degrades to a plain poll.
+
+        Args:
+            since: Unix timestamp (ms) - only return messages after this
+                time. Defaults to the client's cursor.
+            limit: Max messages to return (default 50, max 100)
+            wait: Seconds the relay may hold the request open (default 30)
+
+        Returns:
+            List of message dicts (may be empty if the wait timed out)
+        """
+        if not self.token:
+            raise RuntimeError("Not connected - call connect() first")
+
+        params = {
+            "limit": limit,
+            "wait": wait,
+            "since": self._since if since is None else since
+        }
+
+        # Client-side timeout slightly above the server hold time, so a
+        # held-open request isn't mistaken for a dead connection.
+        response = self.session.get(
+            self._url_messages,
+            params=params,
+            timeout=wait + 5
         )
-        response.raise_for_status()
-        return response.json()["messages"]
+        if response.status_code >= 400:
+            response.raise_for_status()
+        return self._track(orjson.loads(response.content)["messages"])
+
+    def iter_messages(self, since: Optional[int] = None, limit: int = 50,
+                      wait: Optional[int] = None):
+        """
+        Stream-parse a poll response, yielding messages as they arrive.
+
+        Parses the body incrementally with ijson over the raw socket
+        instead of buffering it first, so peak memory stays at about one
+        message plus parser state, and the caller handles early messages
+        while the tail of a large poll window is still in flight.
+        Cursor and dedup tracking match poll_messages; the cursor is
+        persisted when the stream is exhausted or closed.
+
+        Requires ijson (pip install ijson) and the default requests
+        transport (httpx streams responses differently).
+
+        Args:
+            since: Unix timestamp (ms); defaults to the client's cursor
+            limit: Max messages to return (default 50, max 100)
+            wait: Optional long-poll hold time in seconds
+
+        Yields:
+            Message dicts in arrival order
+        """
+        if not self.token:
+            raise RuntimeError("Not connected - call connect() first")
+        if self._is_httpx:
+            # httpx streams via client.stream(), not a stream= kwarg
+            raise RuntimeError("iter_messages requires the requests transport")
+
+        import ijson
+
+        params = {"limit": limit, "since": self._since if since is None else since}
+        if wait is not None:
+            params["wait"] = wait
+
+        response = self.session.get(
+            self._url_messages,
+            params=params,
+            stream=True,
+            timeout=wait + 5 if wait else None
+        )
+        if response.status_code >= 400:
+            response.raise_for_status()
+
+        # Have urllib3 undo the content-encoding before ijson sees the bytes
+        response.raw.decode_content = True
+
+        try:
+            for msg in ijson.items(response.raw, "messages.item"):
+                if self._track_one(msg):
+                    yield msg
+        finally:
+            if self._cursor_path:
+                self._cursor_path.write_text(str(self._since))
+            response.close()
 
     def disconnect(self):
         """Disconnect from relay and invalidate session token."""
         if not self.token:
             return
 
-        requests.delete(
-            f"{self.relay_url}/v1/disconnect",
-            headers={"Authorization": f"Bearer {self.token}"}
-        )
+        self.session.delete(self._url_disconnect)
         self.token = None
+        if "Authorization" in self.session.headers:  # del works on both transports
+            del self.session.headers["Authorization"]
         print("✓ Disconnected")
 
 
+_default_client: Optional[AgoraClient] = None
+
+
+def get_default_client() -> AgoraClient:
+    """
+    Lazily construct one process-wide AgoraClient.
+
+    Everything in the process that talks to the relay shares the same
+    pooled Session - one TLS connection instead of one per agent or
+    module - and the client disconnects automatically at interpreter
+    shutdown. The cursor file lets a restarted agent resume polling
+    where it left off instead of dropping messages queued while offline;
+    it lives next to this script so runs from other working directories
+    share one cursor instead of littering state files around.
+    """
+    global _default_client
+    if _default_client is None:
+        _default_client = AgoraClient(
+            cursor_path=Path(__file__).with_name(".agora_cursor")
+        )
+        atexit.register(_default_client.disconnect)
+    return _default_client
+
+
 def main():
     """Example usage: connect, send, poll in a loop."""
 
     # Option 1: Generate new keys (for first-time setup)
-    client = AgoraClient()
+    client = get_default_client()
     # public_key, private_key = client.generate_keys()
     # print(f"Generated keys:\nPublic:  {public_key}\nPrivate: {private_key}\n")
 
@@ -186,30 +514,62 @@ def main():
         )
         print(f"\n✓ Sent message to {target['name']} (envelope: {envelope_id})")
 
-    # Poll for messages (incremental polling with timestamp tracking)
+    # Long-poll for messages. The client tracks and persists the since-
+    # cursor itself, so each poll only fetches messages newer than the
+    # last one seen - including across restarts.
+    #
+    # Adaptive pacing guards against relays (or proxies) that ignore the
+    # `wait` parameter and answer immediately: the interval halves while
+    # messages flow (down to 100ms) and doubles while idle (up to 30s),
+    # so a degraded long poll neither busy-loops nor adds latency under
+    # load. A poll that was genuinely held open skips the sleep.
     print("\nPolling for messages (Ctrl-C to exit)...")
-    last_timestamp = int(time.time() * 1000)  # Current time in ms
+    interval = 2.0
+    MIN_INTERVAL, MAX_INTERVAL = 0.1, 30.0
+
+    # One C-level fetch of all fields per message instead of repeated
+    # dict indexing inside the loop body
+    get_fields = itemgetter('fromName', 'payload', 'id', 'from')
 
     try:
         while True:
-            messages = client.poll_messages(since=last_timestamp)
-
-            for msg in messages:
-                print(f"\n[{msg['fromName']}] {msg['payload']}")
-
-                # Update timestamp for incremental polling
-                last_timestamp = max(last_timestamp, msg['timestamp'])
+            poll_started = time.monotonic()
+
+            # Accumulate replies while iterating, then drain in one burst -
+            # k pings become one back-to-back flush, not k separate round
+            # trips interleaved with the print loop. iter_messages streams
+            # the parse, so early messages are handled while the tail of a
+            # big poll window is still arriving.
+            received = 0
+            replies = []
+            for msg in client.iter_messages(wait=30):
+                received += 1
+                from_name, payload, msg_id, sender = get_fields(msg)
+                print(f"\n[{from_name}] {payload}")
 
                 # Auto-reply example
-                if msg['payload'].get('text') == 'ping':
-                    client.send(
-                        to=msg['from'],
-                        payload={"text": "pong"},
-                        in_reply_to=msg['id']
-                    )
-                    print(f"  → Replied with 'pong'")
-
-            time.sleep(2)  # Poll every 2 seconds
+                if payload.get('text') == 'ping':
+                    replies.append({
+                        "to": sender,
+                        "payload": {"text": "pong"},
+                        "inReplyTo": msg_id
+                    })
+
+                    if len(replies) >= BATCH_MAX:
+                        client.send_batch(replies)
+                        print(f"  → Replied 'pong' to {len(replies)} pings")
+                        replies = []
+
+            if replies:
+                client.send_batch(replies)
+                print(f"  → Replied 'pong' to {len(replies)} pings")
+
+            if received:
+                interval = max(MIN_INTERVAL, interval * 0.5)
+            else:
+                interval = min(MAX_INTERVAL, interval * 2.0)
+                if time.monotonic() - poll_started < 1.0:
+                    time.sleep(interval)  # Relay answered instantly and empty
 
     except KeyboardInterrupt:
         print("\n\nShutting down...")
@@ -6,24 +6,27 @@ RELAY = "https://agora-relay.lbsa71.net"  # Production relay (or http://localhos
 PUB_KEY = "your-302a-hex-encoded-public-key"
 PRIV_KEY = "your-302e-hex-encoded-private-key"
 
+S = requests.Session()  # One connection for all 3 requests (keep-alive, no repeated TLS)
+
 # 1. Register with relay and obtain JWT session token
-response = requests.post(f"{RELAY}/v1/register", json={
+response = S.post(f"{RELAY}/v1/register", json={
     "publicKey": PUB_KEY,
     "privateKey": PRIV_KEY,
     "name": "my-python-agent"
 })
-token = response.json()["token"]
+reg = response.json()  # Parse once - token and peers come from the same body
+token = reg["token"]
 headers = {"Authorization": f"Bearer {token}"}
 
 # 2. Send a message to a peer
-peer_key = response.json()["peers"][0]["publicKey"]  # First online peer
-requests.post(f"{RELAY}/v1/send", headers=headers, json={
+peer_key = reg["peers"][0]["publicKey"]  # First online peer
+S.post(f"{RELAY}/v1/send", headers=headers, json={
     "to": peer_key,
     "type": "publish",
     "payload": {"text": "Hello from Python!"}
 })
 
 # 3. Poll for inbound messages (use `since` for incremental polling)
-messages = requests.get(f"{RELAY}/v1/messages", headers=headers, params={"since": 0}).json()["messages"]
+messages = S.get(f"{RELAY}/v1/messages", headers=headers, params={"since": 0}).json()["messages"]
 for msg in messages:
     print(f"[{msg['fromName']}] {msg['payload']['text']}")